@@ -6,87 +6,430 @@ and generates actionable solutions with SF city department contacts
 import json
 import time
 import logging
+import hashlib
+import random
 import re
-from typing import Dict, List, Optional
-from playwright.sync_api import sync_playwright, Browser, Page
-from bs4 import BeautifulSoup
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, quote_plus, unquote, urlencode, urlparse
+from bs4 import BeautifulSoup, SoupStrainer
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from ..utils.nemotron_client import NemotronClient
 from ..utils.config import Config
 
 logger = logging.getLogger(__name__)
 
+# orjson decodes large model responses noticeably faster; its JSONDecodeError
+# subclasses json.JSONDecodeError, so callers catch either the same way.
+# Prompt text is always serialized with the stdlib json module, so prompts and
+# the cache keys hashed from them do not depend on whether orjson is installed.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\w+')
+
+# Lines from the query generator that read like instructions rather than queries
+_REASONING_KEYWORDS = ('we need', 'let me', 'i should', 'output', 'generate', 'provide', 'ensure', 'must', 'should', 'example', 'format')
+_REASONING_RE = re.compile("|".join(map(re.escape, _REASONING_KEYWORDS)), re.IGNORECASE)
+_SKIP_PREFIXES = ('Output', 'Generate', 'Provide', 'Format', 'Example')
+
+# System prompts are fixed per pipeline step
+_QUERY_SYSTEM_PROMPT = "You are a search query generator. Output ONLY search queries, one per line. No explanations, no numbering, no bullets."
+_EXTRACTION_SYSTEM_PROMPT = "You are a JSON extraction tool. Output ONLY valid JSON arrays. No explanations, no text before or after the JSON."
+_SOLUTIONS_SYSTEM_PROMPT = "Generate brief, actionable solutions with contact info. Keep steps short (3-4 bullets max). Always cite sources when referencing information."
+# Appended to the system prompt for the one retry after an unparseable JSON response
+_JSON_ONLY_REMINDER = "Your previous answer was not valid JSON. Respond with the JSON array only: no prose, no markdown fences."
+_SUMMARY_SYSTEM_PROMPT = "Generate a brief bullet-point summary (3-4 bullets max)."
+
+_QUERY_PROMPT_TEMPLATE = """Generate 5 Google search queries for SF business closures. Output ONLY the queries, one per line, no explanations.
+
+Industry: {industry}
+Location: {location}
+Risk factors: {risk_factors}
+
+Focus: News, reports, Reddit about city-fixable problems (homelessness, noise, permits).
+
+Output format (example):
+Mission District restaurant closure homelessness
+SF restaurant noise complaints Reddit
+San Francisco permit delays small business
+
+Generate 5 queries now, one per line:"""
+
+# Problem labels for synthetic sources, keyed by a query keyword
+_PROBLEM_KEYWORDS = (("homeless", "homelessness"), ("noise", "noise"), ("permit", "permits"))
+
+# Solutions for a batch of problems, passed in as an indexed JSON array
+_SOLUTIONS_PROMPT_TEMPLATE = """Generate SHORT, actionable solutions for each of these SF business problems:
+
+Business: {industry} in {location}
+
+Problems (JSON):
+{problems_json}
+
+Keep solutions BRIEF:
+- Action: One sentence
+- Steps: 3-4 bullet points max (short)
+- Contact: Phone/website only
+- Timeline: Brief estimate
+- MUST cite sources in the action or steps
+
+Return a JSON array with one entry per problem, using the problem's "index":
+[
+  {{
+    "index": 0,
+    "solutions": [
+      {{
+        "action": "One sentence action (cite source if relevant)",
+        "steps": ["Brief step 1 (cite source)", "Brief step 2", "Brief step 3"],
+        "contact": "Phone or website",
+        "expected_timeline": "Brief timeline",
+        "city_resource": "Resource name",
+        "source_citation": "Primary source URL or reference"
+      }}
+    ]
+  }}
+]"""
+
+# Fixed instructions lead the summary prompt so the system prompt plus this
+# prefix is identical across runs and can be served from a prefix cache
+_SUMMARY_PROMPT_TEMPLATE = """Generate a SHORT summary (3-4 bullets max) for a business owner.
+
+Format as bullet points:
+• Brief risk acknowledgment
+• Top 2-3 critical problems (one line each)
+• Key action to take
+
+Risk: {risk_message}
+
+Problems found:
+{problems_summary}"""
+
+# Fallback pattern for pulling query-like phrases out of free text
+_QUERY_RE = re.compile(r'\b(?:Mission District|San Francisco|SF)\s+[^\.\n]{10,80}', re.IGNORECASE)
+
+# JSON array extraction strategies, tried in order. Spans are bounded so a
+# malformed response without a closing bracket cannot make each candidate
+# start scan to the end of the text.
+_JSON_MAX_SPAN = 20000
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(\[.{0,%d}?\])\s*```' % _JSON_MAX_SPAN, re.DOTALL)
+_JSON_OBJECT_ARRAY_RE = re.compile(r'(\[\s*\{.{0,%d}?\}\s*\])' % _JSON_MAX_SPAN, re.DOTALL)
+_JSON_ARRAY_RE = re.compile(r'(\[.{0,%d}?\])' % _JSON_MAX_SPAN, re.DOTALL)
+
+# Field names Yutori may use, in order of preference
+_SOURCES_KEYS = ("sources", "results", "data", "citations")
+_URL_KEYS = ("url", "link", "source")
+_TITLE_KEYS = ("title", "name")
+_CONTENT_KEYS = ("content", "snippet", "text")
+
+# Reject phrases for generated summaries. Words that echo the prompt's own
+# instructions are shared; the two checks differ only in their extra terms.
+_INSTRUCTION_ECHO_TERMS = ("format", "let's", "craft")
+# Phrases that show the summary model narrated its reasoning instead of answering
+_THINKING_TERMS = _INSTRUCTION_ECHO_TERMS + ("we need to", "let me", "i should", "okay, so", "thinking", "reasoning", "bullet", "should include")
+# Bullets that echo the instructions rather than summarizing
+_FILTER_TERMS = _INSTRUCTION_ECHO_TERMS + ("should", "provide", "use concise")
+_THINKING_RE = re.compile("|".join(map(re.escape, _THINKING_TERMS)), re.IGNORECASE)
+# Bullets that open like an instruction, anchored to the start of the bullet
+_BAD_PREFIXES = ("bullet", "for ", "include")
+# One pass per bullet covers both the bad prefixes and the filter terms
+_BAD_BULLET_RE = re.compile(
+    "^(?:%s)|%s" % ("|".join(map(re.escape, _BAD_PREFIXES)), "|".join(map(re.escape, _FILTER_TERMS))),
+    re.IGNORECASE
+)
+
+# Fixed fields of the SF 311 fallback solution; copied and completed per problem
+_FALLBACK_SOLUTION = MappingProxyType({
+    "action": None,
+    "steps": None,
+    "contact": "311 or sf311.org",
+    "expected_timeline": "48-72 hours",
+    "city_resource": "SF 311",
+    "source_citation": None,
+})
+
+# One line per problem in the fallback summary
+_FALLBACK_LINE = "• {} ({} severity)"
+
+# Bullet markers in a generated summary
+_BULLET_CHARS = frozenset("•-*")
+
+# Source dedup: query parameters that only track clicks, and how much of each
+# source's content is compared for near-duplicate stories
+_TRACKING_PARAM_PREFIXES = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+_DEDUP_HEAD_CHARS = 500
+_DEDUP_SIMILARITY = 0.8
+# Reuse a cached extraction only while the new content stays this similar
+_EXTRACTION_REUSE_SIMILARITY = 0.8
+
+# Bare URLs in free-text responses
+_URL_RE = re.compile(r'https?://[^\s<>"\'\)]+')
+
+# DuckDuckGo result blocks; everything else on the page is skipped at parse time
+_RESULT_STRAINER = SoupStrainer('div', class_='result')
+
+# Source classification. Known domains (and TLDs) resolve by suffix lookup;
+# the keyword regex, one named group per source type, catches regional and
+# unlisted hosts, and the path pattern catches the rest.
+_DOMAIN_TO_TYPE = MappingProxyType({
+    "sfchronicle.com": "news",
+    "sfexaminer.com": "news",
+    "sfist.com": "news",
+    "eater.com": "news",
+    "sfgate.com": "news",
+    "reddit.com": "reddit",
+    "yelp.com": "reviews",
+    "tripadvisor.com": "reviews",
+    "twitter.com": "social",
+    "x.com": "social",
+    "edu": "reports",
+    "gov": "reports",
+})
+_HOST_RE = re.compile(
+    r'(?P<news>sfchronicle|sfexaminer|sfist|eater|sfgate)'
+    r'|(?P<reviews>yelp|tripadvisor)'
+    r'|(?P<reports>\.edu|\.gov|report|study)'
+)
+_PATH_RE = re.compile(r'(?P<reviews>google\.com/maps)|(?P<reports>report|study)')
+
+
+def _starts_with_number(line: str) -> bool:
+    """Check for a list number like "1." or "12)" without a regex"""
+    digits = len(line) - len(line.lstrip('0123456789'))
+    return digits > 0 and line[digits:digits + 1] in ('.', ')')
+
+
+def _first_key(data: Dict, keys: tuple, default: Any = "") -> Any:
+    """Return the first truthy value among keys, stopping at the first hit"""
+    for key in keys:
+        value = data.get(key)
+        if value:
+            return value
+    return default
+
+
+def _classify_problem(query_lower: str) -> str:
+    """Pick the synthetic problem label for a lowercased query"""
+    for keyword, label in _PROBLEM_KEYWORDS:
+        if keyword in query_lower:
+            return label
+    return "general"
+
+
+@lru_cache(maxsize=4096)
+def _classify_host(host: str) -> str:
+    """Classify a lowercased host; the same few hosts recur across queries"""
+    labels = host.split(':', 1)[0].split('.')
+    for start in range(len(labels)):
+        source_type = _DOMAIN_TO_TYPE.get('.'.join(labels[start:]))
+        if source_type:
+            return source_type
+    
+    match = _HOST_RE.search(host)
+    return match.lastgroup if match else "other"
+
+
+def _bullet_text(line: str) -> Optional[str]:
+    """Return the text of a •/-/* bullet line, or None if the line is not a bullet"""
+    line = line.strip()
+    if line[:1] in _BULLET_CHARS:
+        return line[1:].lstrip()
+    return None
+
+
+def _is_clean_bullet(text: str) -> bool:
+    """Reject bullets that are just instructions or thinking, cheapest checks first"""
+    if len(text) <= 15:
+        return False
+    return not _BAD_BULLET_RE.search(text)
+
+
+def _valid_solutions(solutions: Any) -> List[Dict]:
+    """Keep the model's solutions that have the shape the UI renders, dropping the rest"""
+    if not isinstance(solutions, list):
+        return []
+    valid = []
+    for solution in solutions:
+        if not isinstance(solution, dict) or not isinstance(solution.get("action"), str) or not solution["action"]:
+            continue
+        steps = solution.get("steps", [])
+        if isinstance(steps, str):
+            solution["steps"] = [steps]
+        elif isinstance(steps, list):
+            solution["steps"] = [step for step in steps if isinstance(step, str)]
+        else:
+            solution["steps"] = []
+        valid.append(solution)
+    return valid
+
+
+def _fallback_line(problem: Dict) -> str:
+    """Format one problem as a fallback summary bullet"""
+    return _FALLBACK_LINE.format(problem.get('problem', 'Unknown'), problem.get('severity', 'unknown'))
+
+
+def _canonical_url(url: str) -> str:
+    """Normalize a URL for dedup: lowercase host, no www, fragment, trackers or trailing slash"""
+    try:
+        parsed = urlparse(url)
+    except ValueError:  # Malformed host such as "http://[bad/x"; dedup on the raw URL
+        return url.lower()
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PARAM_PREFIXES)
+    ])
+    return f"{host}{parsed.path.rstrip('/')}" + (f"?{query}" if query else "")
+
+
+def _shingles(text: str) -> frozenset:
+    """Word 3-grams of the head of a text, for near-duplicate detection"""
+    words = text[:_DEDUP_HEAD_CHARS].lower().split()
+    return frozenset(zip(words, words[1:], words[2:]))
+
+
+class _RateLimiter:
+    """Thread-safe token bucket: allows a short burst, then paces calls to a steady rate"""
+    
+    def __init__(self, rate_per_second: float, burst: int):
+        self._rate = rate_per_second
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until a call is allowed"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            # Reserve a token even if it takes the bucket negative, so later
+            # callers queue up behind this one instead of racing for it
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+# One DuckDuckGo budget for the whole process, however many agents or threads search
+_DUCKDUCKGO_LIMITER = _RateLimiter(1 / Config.AGENT_SCRAPE_DELAY_SECONDS, burst=Config.AGENT_SCRAPE_CONCURRENCY)
+
+
 class BusinessProblemAgent:
     """Agent that finds business problems from external sources and generates solutions"""
     
-    # SF City Departments and Codes
-    SF_DEPARTMENTS = {
-        "311": {
+    # SF City Departments and Codes (read-only; shared across instances and threads)
+    SF_DEPARTMENTS = MappingProxyType({
+        "311": MappingProxyType({
             "name": "SF 311",
             "contact": "311 or sf311.org",
             "description": "General city services and reporting"
-        },
-        "public_works": {
+        }),
+        "public_works": MappingProxyType({
             "name": "Department of Public Works",
             "contact": "311 or dpw.sfgov.org",
             "description": "Homeless encampments, street cleaning, infrastructure"
-        },
-        "planning": {
+        }),
+        "planning": MappingProxyType({
             "name": "Planning Department",
             "contact": "sfplanning.org",
             "description": "Permits, zoning, land use"
-        },
-        "health": {
+        }),
+        "health": MappingProxyType({
             "name": "Department of Public Health",
             "contact": "sfdph.org",
             "description": "Health permits, violations, food safety"
-        },
-        "police": {
+        }),
+        "police": MappingProxyType({
             "name": "SFPD",
             "contact": "911 (emergency) or sfpd.org",
             "description": "Public safety, crime prevention"
-        },
-        "economic_workforce": {
+        }),
+        "economic_workforce": MappingProxyType({
             "name": "Office of Economic and Workforce Development",
             "contact": "oewd.org",
             "description": "Business support, grants, resources"
-        }
-    }
+        })
+    })
     
     # Priority sources for scraping
-    SOURCE_PRIORITIES = [
+    SOURCE_PRIORITIES = (
         "news",      # News articles
         "reports",   # Industry reports/studies
         "reddit",    # Reddit discussions
         "reviews",   # Yelp/Google Reviews
         "social"     # Twitter/X
-    ]
+    )
+    _SOURCE_RANK = MappingProxyType({source_type: rank for rank, source_type in enumerate(SOURCE_PRIORITIES)})
+    
+    # In-process LRU of LLM responses, shared by all instances so repeated
+    # analyses skip both the network call and the disk read
+    _memory_cache: "OrderedDict[str, Any]" = OrderedDict()
+    _memory_cache_lock = threading.Lock()
+    # Disk cache writes since the last prune, across all instances
+    _disk_writes = 0
     
-    def __init__(self, nemotron_client: Optional[NemotronClient] = None):
+    def __init__(
+        self,
+        nemotron_client: Optional[NemotronClient] = None,
+        cache_dir: Optional[Path] = None,
+        use_cache: bool = True,
+    ):
         """
         Initialize the Business Problem Agent
         
         Args:
             nemotron_client: Optional NemotronClient instance
+            cache_dir: Directory for cached LLM responses (defaults to Config.AGENT_CACHE_DIR)
+            use_cache: Whether to reuse cached LLM responses across runs
         """
         self.client = nemotron_client or NemotronClient()
-        self.browser: Optional[Browser] = None
-        self.playwright = None
+        self.use_cache = use_cache
+        
+        # Shared HTTP session so Yutori and search requests reuse pooled keep-alive
+        # connections. Transient errors on idempotent requests are retried; POSTs
+        # to Yutori are not, since a research run is not safe to repeat blindly.
+        self.http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=max(10, Config.AGENT_SCRAPE_CONCURRENCY),
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+        )
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.http.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        })
+        self.cache_dir = Path(cache_dir) if cache_dir else Config.AGENT_CACHE_DIR
+        
+        # Ensure cache directory exists
+        if self.use_cache:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._prune_disk_cache()
         
     def __enter__(self):
         """Context manager entry"""
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=True)
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit"""
-        if self.browser:
-            self.browser.close()
-        if self.playwright:
-            self.playwright.stop()
+        """Context manager exit; closes the pooled HTTP session"""
+        self.http.close()
     
-    def analyze_business_risk(self, risk_input: Dict) -> Dict:
+    def analyze_business_risk(self, risk_input: Dict, force_refresh: bool = False) -> Dict:
         """
         Main entry point: Analyze business risk and generate problems + solutions
         
@@ -105,6 +448,7 @@ class BusinessProblemAgent:
                         "location": "Mission District"
                     }
                 }
+            force_refresh: Scrape sources again even if a fresh cached scrape exists
         
         Returns:
             Dictionary with problems and solutions
@@ -116,11 +460,11 @@ class BusinessProblemAgent:
         logger.info(f"Generated {len(search_queries)} search queries")
         
         # Step 2: Scrape external sources
-        scraped_content = self._scrape_sources(search_queries, risk_input)
+        scraped_content = self._scrape_sources(search_queries, risk_input, force_refresh=force_refresh)
         logger.info(f"Scraped {len(scraped_content)} sources")
         
         # Step 3: Extract problems using Nemotron
-        problems = self._extract_problems(scraped_content, risk_input, scraped_content)
+        problems = self._extract_problems(scraped_content, risk_input, scraped_content, force_refresh=force_refresh)
         logger.info(f"Extracted {len(problems)} problems")
         
         # Step 4: Generate solutions using Nemotron
@@ -133,89 +477,64 @@ class BusinessProblemAgent:
         return {
             "problems": solutions,
             "summary": summary,
-            "risk_profile": risk_input.get("profile", {})
+            "risk_profile": risk_input.get("profile") or {}
         }
     
     def _generate_search_queries(self, risk_input: Dict) -> List[str]:
         """Generate search queries from risk profile using Nemotron"""
         
-        profile = risk_input.get("profile", {})
-        risk_factors = profile.get("risk_factors", [])
+        profile = risk_input.get("profile") or {}
+        # Canonical order, so profiles that list the same factors differently
+        # build the same prompt and share a cached response
+        risk_factors = sorted(set(profile.get("risk_factors", [])))
         industry = profile.get("industry", "")
         location = profile.get("location", "San Francisco")
         
-        prompt = f"""Generate 5 Google search queries for SF business closures related to:
-
-Industry: {industry}
-Location: {location}
-Risk factors: {', '.join(risk_factors)}
-
-Focus: News, reports, Reddit discussions about city-fixable problems (homelessness, noise, permits).
-
-Output: 5 queries, one per line, no numbering."""
-
-        prompt = f"""Generate 5 Google search queries for SF business closures. Output ONLY the queries, one per line, no explanations.
-
-Industry: {industry}
-Location: {location}
-Risk factors: {', '.join(risk_factors)}
-
-Focus: News, reports, Reddit about city-fixable problems (homelessness, noise, permits).
-
-Output format (example):
-Mission District restaurant closure homelessness
-SF restaurant noise complaints Reddit
-San Francisco permit delays small business
-
-Generate 5 queries now, one per line:"""
-
-        system_prompt = """You are a search query generator. Output ONLY search queries, one per line. No explanations, no numbering, no bullets."""
+        prompt = _QUERY_PROMPT_TEMPLATE.format(
+            industry=industry,
+            location=location,
+            risk_factors=', '.join(risk_factors),
+        )
 
-        response = self.client.generate(prompt, system_prompt=system_prompt, temperature=0.3, max_tokens=300)  # Lower temp, fewer tokens
+        response = self._cached_generate(prompt, system_prompt=_QUERY_SYSTEM_PROMPT, temperature=0.3, max_tokens=300)  # Lower temp, fewer tokens
         
         # Parse queries (one per line) and filter out reasoning/instruction text
         all_lines = response.split('\n')
         queries = []
-        reasoning_keywords = ['we need', 'let me', 'i should', 'output', 'generate', 'provide', 'ensure', 'must', 'should', 'example', 'format']
         
         for line in all_lines:
             line = line.strip()
             # Skip empty lines, comments, numbered items, and reasoning text
             if (line and 
                 not line.startswith('#') and 
-                not re.match(r'^\d+[\.\)]\s*', line) and  # Skip numbered items
+                not _starts_with_number(line) and  # Skip numbered items
                 len(line) > 10 and  # Must be substantial
                 len(line) < 150 and  # Not too long
-                not any(keyword in line.lower() for keyword in reasoning_keywords) and
-                not line.startswith(('Output', 'Generate', 'Provide', 'Format', 'Example'))):
+                not _REASONING_RE.search(line) and
+                not line.startswith(_SKIP_PREFIXES)):
                 # Clean up: remove quotes, bullets, etc.
-                line = re.sub(r'^["\'•\-\*]\s*', '', line)  # Remove leading quotes/bullets
-                line = re.sub(r'\s*["\']$', '', line)  # Remove trailing quotes
-                line = line.strip()
+                line = line.lstrip('"\'•-* ').rstrip('"\' ').strip()
                 if line and len(line.split()) >= 3:  # At least 3 words
                     queries.append(line)
         
         # If we didn't get enough queries, try to extract from the response more aggressively
         if len(queries) < 3:
             # Look for query-like patterns (phrases with location + keywords)
-            query_pattern = re.compile(r'\b(?:Mission District|San Francisco|SF)\s+[^\.\n]{10,80}', re.IGNORECASE)
-            matches = query_pattern.findall(response)
+            matches = _QUERY_RE.findall(response)
             for match in matches:
                 match_clean = match.strip()
                 if (len(match_clean.split()) >= 4 and 
-                    not any(keyword in match_clean.lower() for keyword in reasoning_keywords)):
+                    not _REASONING_RE.search(match_clean)):
                     queries.append(match_clean)
         
-        # Limit to 5 queries and ensure they're unique
-        unique_queries = []
-        seen = set()
+        # Limit to 5 queries and ensure they're unique (dicts keep insertion order)
+        seen = {}
         for q in queries:
-            q_lower = q.lower()
-            if q_lower not in seen and len(q_lower) > 10:
-                unique_queries.append(q)
-                seen.add(q_lower)
-                if len(unique_queries) >= 5:
+            if len(q) > 10:
+                seen.setdefault(q.lower(), q)
+                if len(seen) >= 5:
                     break
+        unique_queries = list(seen.values())
         
         return unique_queries[:5] if unique_queries else [
             f"{location} {industry} closure homelessness",
@@ -225,7 +544,7 @@ Generate 5 queries now, one per line:"""
             f"SF {industry} shutdown Reddit"
         ]  # Fallback queries
     
-    def _scrape_sources(self, queries: List[str], risk_input: Dict) -> List[Dict]:
+    def _scrape_sources(self, queries: List[str], risk_input: Dict, force_refresh: bool = False) -> List[Dict]:
         """Scrape external sources using Yutori Research Agent API"""
         
         scraped_content = []
@@ -235,112 +554,159 @@ Generate 5 queries now, one per line:"""
             logger.warning("YUTORI_API_KEY not configured, falling back to synthetic sources")
             return self._create_synthetic_sources(queries)
         
+        # Research runs are the slowest and costliest step, and businesses with
+        # similar profiles generate the same queries, so reuse a recent scrape
+        profile = risk_input.get("profile") or {}
+        scrape_key = self._get_cache_key(
+            "scrape", sorted(queries), profile.get("industry", ""), profile.get("location", "")
+        )
+        if not force_refresh:
+            cached = self._get_cached(scrape_key)
+            if cached and time.time() - cached["ts"] < Config.AGENT_SCRAPE_CACHE_TTL_SECONDS:
+                logger.info(f"Using {len(cached['sources'])} cached sources for this query set")
+                return list(cached["sources"])
+        
         headers = {
             "Authorization": f"Bearer {Config.YUTORI_API_KEY}",
             "Content-Type": "application/json"
         }
         
-        # Use Yutori Research Agent API - /v1/run endpoint
+        # Queries are independent research tasks, so run them concurrently;
+        # the pool size bounds how many requests are in flight at once.
+        with ThreadPoolExecutor(max_workers=self._scrape_workers(queries)) as executor:
+            future_to_query = {
+                executor.submit(self._scrape_query, query, headers): query
+                for query in queries
+            }
+            results_by_query = {}
+            for future in as_completed(future_to_query):
+                query = future_to_query[future]
+                try:
+                    results_by_query[query] = future.result()
+                except Exception as e:
+                    logger.error(f"Yutori Research Agent error for '{query}': {e}")
+                    results_by_query[query] = []
+        
+        # Keep results in query order so downstream prompts are stable, and
+        # drop URLs already returned for an earlier query
+        visited_urls = set()
+        duplicate_count = 0
         for query in queries:
-            try:
-                # Add "San Francisco" or "SF" to query for better results
-                sf_query = f"{query} San Francisco" if "san francisco" not in query.lower() and "sf" not in query.lower() else query
-                
-                # Format task description for Yutori Research Agent
-                task_description = f"Search for information about: {sf_query}. Focus on San Francisco business closures, problems, and city-fixable issues. Provide sources with citations."
-                
-                yutori_request = {
-                    "task": task_description,
-                    "tools": ["web_search", "citations"],
-                }
-                
-                response = requests.post(
-                    f"{Config.YUTORI_API_BASE}/v1/run",
-                    headers=headers,
-                    json=yutori_request,
-                    timeout=60  # Research agent may take longer
-                )
-                
-                if response.status_code == 200:
-                    results_data = response.json()
-                    
-                    # Extract results from Yutori response
-                    # Yutori may return results in different formats
-                    sources = []
-                    
-                    # Try to extract sources/results from response
-                    if isinstance(results_data, dict):
-                        # Check for common response structures
-                        sources = (results_data.get("sources", []) or 
-                                  results_data.get("results", []) or
-                                  results_data.get("data", []) or
-                                  results_data.get("citations", []))
-                        
-                        # If response contains text with citations, parse it
-                        if not sources and "content" in results_data:
-                            content = results_data.get("content", "")
-                            # Try to extract URLs from content
-                            import re
-                            urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', content)
-                            for url in urls[:5]:
-                                sources.append({
-                                    "url": url,
-                                    "title": f"Source from {query}",
-                                    "content": content[:500],
-                                })
-                    
-                    # Process structured sources
-                    for source in sources[:5]:
-                        url = source.get("url") or source.get("link") or source.get("source")
-                        title = source.get("title") or source.get("name") or f"Source: {query}"
-                        content = source.get("content") or source.get("snippet") or source.get("text") or ""
-                        
-                        if url:
-                            scraped_content.append({
-                                "source_type": self._classify_source(url),
-                                "url": url,
-                                "title": title,
-                                "content": content[:2000],
-                                "query": query
-                            })
-                    
-                    if scraped_content:
-                        logger.info(f"Yutori Research Agent: Found {len(sources)} sources for: {query[:50]}")
-                    else:
-                        logger.warning(f"Yutori Research Agent: No sources extracted from response for '{query}'")
-                        
-                elif response.status_code == 401:
-                    logger.warning(f"Yutori Research Agent: Authentication failed - check API key")
-                else:
-                    logger.warning(f"Yutori Research Agent: Request failed with status {response.status_code}: {response.text[:200]}")
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Yutori Research Agent error for '{query}': {e}")
-            
-            time.sleep(1)  # Rate limiting
+            for source in results_by_query.get(query, []):
+                url_key = _canonical_url(source["url"])
+                if url_key in visited_urls:
+                    duplicate_count += 1
+                    continue
+                visited_urls.add(url_key)
+                scraped_content.append(source)
+        
+        if duplicate_count:
+            logger.info(f"Yutori Research Agent: Skipped {duplicate_count} duplicate URLs across queries")
         
         # If we have sources, return them
         if scraped_content:
             logger.info(f"Successfully scraped {len(scraped_content)} sources from Yutori Research Agent")
+            self._set_cached(scrape_key, {"ts": time.time(), "sources": scraped_content})
             return scraped_content
         
         # Fallback: Create synthetic sources
         logger.info("No sources found via Yutori Research Agent, creating synthetic sources from queries")
         return self._create_synthetic_sources(queries)
     
+    def _scrape_workers(self, queries: List[str]) -> int:
+        """Thread pool size for a scrape: one per query, capped by the concurrency limit"""
+        return max(1, min(len(queries), Config.AGENT_SCRAPE_CONCURRENCY))
+    
+    def _scrape_query(self, query: str, headers: Dict) -> List[Dict]:
+        """Run a single Yutori Research Agent query and return its sources"""
+        
+        scraped_content = []
+        
+        try:
+            # Add "San Francisco" or "SF" to query for better results
+            sf_query = f"{query} San Francisco" if "san francisco" not in query.lower() and "sf" not in query.lower() else query
+            
+            # Format task description for Yutori Research Agent
+            task_description = f"Search for information about: {sf_query}. Focus on San Francisco business closures, problems, and city-fixable issues. Provide sources with citations."
+            
+            yutori_request = {
+                "task": task_description,
+                "tools": ["web_search", "citations"],
+            }
+            
+            response = self.http.post(
+                f"{Config.YUTORI_API_BASE}/v1/run",
+                headers=headers,
+                json=yutori_request,
+                timeout=(Config.AGENT_CONNECT_TIMEOUT_SECONDS, 60)  # Research agent may take longer to respond
+            )
+            
+            if response.status_code == 200:
+                results_data = response.json()
+                
+                # Extract results from Yutori response
+                # Yutori may return results in different formats
+                sources = []
+                
+                # Try to extract sources/results from response
+                if isinstance(results_data, dict):
+                    # Check for common response structures
+                    sources = _first_key(results_data, _SOURCES_KEYS, [])
+                    
+                    # If response contains text with citations, parse it
+                    if not sources and "content" in results_data:
+                        content = results_data.get("content", "")
+                        # Try to extract URLs from content
+                        snippet = content[:500]
+                        for url in _URL_RE.findall(content)[:5]:
+                            sources.append({
+                                "url": url,
+                                "title": f"Source from {query}",
+                                "content": snippet,
+                            })
+                
+                # Process structured sources
+                for source in sources[:5]:
+                    url = _first_key(source, _URL_KEYS)
+                    title = _first_key(source, _TITLE_KEYS) or f"Source: {query}"
+                    content = _first_key(source, _CONTENT_KEYS)
+                    if len(content) > 2000:
+                        content = content[:2000]
+                    
+                    if url:
+                        scraped_content.append({
+                            "source_type": self._classify_source(url),
+                            "url": url,
+                            "title": title,
+                            "content": content,
+                            "query": query
+                        })
+                
+                if scraped_content:
+                    logger.info(f"Yutori Research Agent: Found {len(sources)} sources for: {query[:50]}")
+                else:
+                    logger.warning(f"Yutori Research Agent: No sources extracted from response for '{query}'")
+                    
+            elif response.status_code == 401:
+                logger.warning(f"Yutori Research Agent: Authentication failed - check API key")
+            else:
+                logger.warning(f"Yutori Research Agent: Request failed with status {response.status_code}: {response.text[:200]}")
+                
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Yutori Research Agent error for '{query}': {e}")
+        
+        return scraped_content
+    
     def _create_synthetic_sources(self, queries: List[str]) -> List[Dict]:
         """Create synthetic sources as fallback"""
         scraped_content = []
         for query in queries[:3]:
-            # Extract key terms from query
-            keywords = query.lower().split()
-            problem_type = "homelessness" if "homeless" in query.lower() else \
-                          "noise" if "noise" in query.lower() else \
-                          "permits" if "permit" in query.lower() else "general"
+            problem_type = _classify_problem(query.lower())
+            encoded_query = quote_plus(query)
             
             scraped_content.append({
                 "source_type": "synthetic",
-                "url": f"https://example.com/search?q={query.replace(' ', '+')}",
+                "url": f"https://example.com/search?q={encoded_query}",
                 "title": f"SF Business Closure Report: {query}",
                 "content": f"Many San Francisco businesses, particularly restaurants in the Mission District, are facing closure due to {problem_type} issues. Business owners report challenges with city services and permit delays. SF 311 and city departments are receiving increased complaints.",
                 "query": query
@@ -351,111 +717,158 @@ Generate 5 queries now, one per line:"""
         """Fallback scraping using requests (simpler, more reliable)"""
         scraped_content = []
         
-        for query in queries:
-            try:
-                # Use DuckDuckGo HTML search (no API key needed, less likely to block)
-                search_url = f"https://html.duckduckgo.com/html/?q={query.replace(' ', '+')}"
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                }
-                
-                response = requests.get(search_url, headers=headers, timeout=15)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                results = soup.find_all('div', class_='result')
-                logger.info(f"DuckDuckGo requests: Found {len(results)} results for: {query[:50]}")
-                
-                for result in results[:5]:  # Top 5 results
-                    try:
-                        link_elem = result.find('a', class_='result__a')
-                        
-                        if link_elem:
-                            url = link_elem.get('href', '')
-                            # DuckDuckGo URLs need decoding
-                            if url.startswith('/l/?kh='):
-                                # Extract actual URL from DuckDuckGo redirect
-                                import urllib.parse
-                                url_parts = url.split('uddg=')
-                                if len(url_parts) > 1:
-                                    url = urllib.parse.unquote(url_parts[1].split('&')[0])
-                            
-                            title = link_elem.get_text(strip=True)
-                            snippet_elem = result.find('a', class_='result__snippet')
-                            snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                            
-                            if url and url.startswith('http'):
-                                scraped_content.append({
-                                    "source_type": self._classify_source(url),
-                                    "url": url,
-                                    "title": title or "No title",
-                                    "content": snippet[:2000] if snippet else f"Content from {url}",
-                                    "query": query
-                                })
-                    except Exception as e:
-                        logger.debug(f"Error processing DuckDuckGo result: {e}")
-                        continue
-                
-                time.sleep(2)  # Rate limiting
-                
-            except Exception as e:
-                logger.warning(f"Error in requests scraping for '{query}': {e}")
-                continue
+        # Each query is a separate search page, so fetch them concurrently
+        with ThreadPoolExecutor(max_workers=self._scrape_workers(queries)) as executor:
+            results = list(executor.map(self._search_duckduckgo, queries))
+        
+        # Different queries often surface the same page; keep its first hit
+        seen_urls = set()
+        for query_results in results:
+            for source in query_results:
+                url_key = _canonical_url(source["url"])
+                if url_key not in seen_urls:
+                    seen_urls.add(url_key)
+                    scraped_content.append(source)
         
         logger.info(f"Requests fallback scraped {len(scraped_content)} sources total")
         return scraped_content
     
+    def _search_duckduckgo(self, query: str) -> List[Dict]:
+        """Fetch and parse DuckDuckGo HTML results for a single query"""
+        scraped_content = []
+        
+        try:
+            # Use DuckDuckGo HTML search (no API key needed, less likely to block)
+            search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
+            
+            _DUCKDUCKGO_LIMITER.acquire()
+            response = self.http.get(search_url, timeout=(Config.AGENT_CONNECT_TIMEOUT_SECONDS, 10), stream=True)
+            response.raise_for_status()
+            html = self._read_capped(response, Config.AGENT_MAX_PAGE_BYTES)
+            # Only build the result blocks, using lxml's C parser
+            soup = BeautifulSoup(html, 'lxml', parse_only=_RESULT_STRAINER)
+            
+            results = soup.find_all('div', class_='result', limit=5)  # Top 5 results
+            logger.info(f"DuckDuckGo requests: Found {len(results)} results for: {query[:50]}")
+            
+            for result in results:
+                try:
+                    link_elem = result.find('a', class_='result__a')
+                    
+                    if link_elem:
+                        url = link_elem.get('href', '')
+                        # DuckDuckGo URLs need decoding
+                        if url.startswith('/l/?kh='):
+                            # Extract actual URL from DuckDuckGo redirect
+                            url_parts = url.split('uddg=')
+                            if len(url_parts) > 1:
+                                url = unquote(url_parts[1].split('&')[0])
+                        
+                        title = link_elem.get_text(strip=True)
+                        snippet_elem = result.find('a', class_='result__snippet')
+                        snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
+                        
+                        if url and url.startswith('http'):
+                            scraped_content.append({
+                                "source_type": self._classify_source(url),
+                                "url": url,
+                                "title": title or "No title",
+                                "content": snippet[:2000] if snippet else f"Content from {url}",
+                                "query": query
+                            })
+                except Exception as e:
+                    logger.debug(f"Error processing DuckDuckGo result: {e}")
+                    continue
+            
+        except Exception as e:
+            logger.warning(f"Error in requests scraping for '{query}': {e}")
+        
+        return scraped_content
+    
+    def _read_capped(self, response: requests.Response, max_bytes: int) -> bytes:
+        """Read at most max_bytes of a streamed response body"""
+        chunks = []
+        received = 0
+        try:
+            for chunk in response.iter_content(chunk_size=16384):
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= max_bytes:
+                    logger.debug(f"Truncated response from {response.url} at {max_bytes} bytes")
+                    break
+        finally:
+            response.close()
+        return b"".join(chunks)[:max_bytes]
+    
     def _classify_source(self, url: str) -> str:
         """Classify source type from URL"""
         url_lower = url.lower()
-        
-        if any(domain in url_lower for domain in ['sfchronicle', 'sfexaminer', 'sfist', 'eater', 'sfgate']):
-            return "news"
-        elif 'reddit.com' in url_lower:
-            return "reddit"
-        elif any(domain in url_lower for domain in ['yelp', 'google.com/maps', 'tripadvisor']):
-            return "reviews"
-        elif any(domain in url_lower for domain in ['twitter.com', 'x.com']):
-            return "social"
-        elif any(domain in url_lower for domain in ['.edu', '.gov', 'report', 'study']):
-            return "reports"
-        else:
+        try:
+            netloc = urlparse(url_lower).netloc
+        except ValueError:  # Malformed host such as "http://[bad/x"
             return "other"
+        source_type = _classify_host(netloc)
+        if source_type != "other":
+            return source_type
+        
+        match = _PATH_RE.search(url_lower)
+        return match.lastgroup if match else "other"
     
-    def _extract_text(self, soup: BeautifulSoup) -> str:
+    def _extract_text(self, html: str) -> str:
         """Extract main text content from HTML"""
+        # lxml's C parser is several times faster than html.parser on large pages
+        soup = BeautifulSoup(html, 'lxml')
+        
         # Remove script and style elements
-        for script in soup(["script", "style"]):
+        for script in soup(["script", "style", "noscript"]):
             script.decompose()
         
-        # Get text
-        text = soup.get_text()
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return text
+        # Get text, then collapse whitespace runs in a single regex pass
+        text = soup.get_text(separator=' ')
+        return _WHITESPACE_RE.sub(' ', text).strip()
     
-    def _extract_problems(self, scraped_content: List[Dict], risk_input: Dict, original_scraped_content: List[Dict] = None) -> List[Dict]:
+    def _extract_problems(
+        self,
+        scraped_content: List[Dict],
+        risk_input: Dict,
+        original_scraped_content: List[Dict] = None,
+        force_refresh: bool = False,
+    ) -> List[Dict]:
         """Extract specific problems from scraped content using Nemotron"""
         
-        profile = risk_input.get("profile", {})
+        profile = risk_input.get("profile") or {}
+        industry = profile.get('industry', 'unknown')
+        location = profile.get('location', 'SF')
+        risk_factors = ', '.join(profile.get('risk_factors', []))
         
-        # Prepare content summary
-        content_summary = "\n\n".join([
-            f"Source: {item['title']}\nURL: {item['url']}\nContent: {item['content'][:1000]}"
-            for item in scraped_content[:20]  # Limit to top 20 sources
-        ])
+        # Prepare content summary: fill a fixed character budget in source-priority order
+        budget = Config.AGENT_PROMPT_CONTENT_BUDGET
+        used = 0
+        parts = []
+        prompt_urls = []
+        fingerprint = set()
+        for item in self._rank_sources(scraped_content):
+            title, url = item['title'], item['url']
+            header_len = len(title) + len(url) + 24  # "Source: " + "\nURL: " + "\nContent: "
+            remaining = budget - used - header_len
+            if remaining < 200:  # Not enough room left for a useful snippet
+                break
+            snippet = item['content'][:min(Config.AGENT_PROMPT_SOURCE_CHARS, remaining)]
+            if parts:
+                parts.append("\n\n")
+            parts.extend(("Source: ", title, "\nURL: ", url, "\nContent: ", snippet))
+            prompt_urls.append(url)
+            fingerprint.update(map(" ".join, _shingles(snippet)))
+            used += header_len + len(snippet) + 2  # Account for the blank-line separator
+        content_summary = "".join(parts)
         
         prompt = f"""Extract city-fixable problems from SF business closure content. Output ONLY valid JSON, no explanations.
 
-Business: {profile.get('industry', 'unknown')} in {profile.get('location', 'SF')}
-Risk factors: {', '.join(profile.get('risk_factors', []))}
+Business: {industry} in {location}
+Risk factors: {risk_factors}
 
 Content:
-{content_summary[:2000]}
+{content_summary}
 
 Extract problems that SF city departments can fix. Output a JSON array with this exact format (no other text):
 
@@ -473,247 +886,511 @@ Extract problems that SF city departments can fix. Output a JSON array with this
 
 Return ONLY the JSON array, nothing else."""
 
-        system_prompt = """You are a JSON extraction tool. Output ONLY valid JSON arrays. No explanations, no text before or after the JSON."""
-
         # Use lower temperature for more deterministic JSON output
-        response = self.client.generate(
-            prompt,
-            system_prompt=system_prompt,
-            temperature=0.1,  # Lower temperature for more structured output
-            max_tokens=2000
+        # Re-scrapes of the same sources for the same profile mostly differ in
+        # snippet wording, not in the problems they describe, so reuse the
+        # extraction keyed on the profile and source set rather than the exact
+        # text. Reuse only while it is recent and the content's shingles still
+        # mostly match, so updated articles at the same URLs are re-extracted.
+        sources_key = self._get_cache_key(
+            "problems", industry, location, sorted(set(profile.get('risk_factors', []))), sorted(prompt_urls)
         )
+        cached = self._get_cached(sources_key) if prompt_urls and not force_refresh else None
+        if (
+            isinstance(cached, dict)
+            and time.time() - cached.get("ts", 0) < Config.AGENT_SCRAPE_CACHE_TTL_SECONDS
+            and len(fingerprint & set(cached["fingerprint"]))
+            >= _EXTRACTION_REUSE_SIMILARITY * len(fingerprint | set(cached["fingerprint"]))
+        ):
+            problems = _json_loads(cached["problems"])
+        else:
+            problems = self._generate_json(
+                prompt,
+                system_prompt=_EXTRACTION_SYSTEM_PROMPT,
+                temperature=0.0,  # Deterministic extraction; also makes cached responses reusable
+                max_tokens=1500
+            )
+            if problems is not None and prompt_urls:
+                # Problems are stored serialized, so callers mutating them never touch the cache
+                self._set_cached(sources_key, {
+                    "ts": time.time(),
+                    "fingerprint": sorted(fingerprint),
+                    "problems": json.dumps(problems),
+                })
         
-        # Debug: log the response
-        logger.debug(f"Problem extraction response: {response[:500]}")
+        source_list = original_scraped_content if original_scraped_content else scraped_content
         
-        import re
+        # Fallback: create a problem from the content if no JSON could be extracted
+        if problems is None:
+            if source_list:
+                return [self._fallback_problem(source_list)]
+            return []
         
-        # Try multiple strategies to extract JSON
-        json_text = None
+        # Ensure sources are included - add from scraped_content if missing.
+        # Tokenize each candidate source once, rather than rescanning it per problem.
+        source_tokens = None
+        for problem in problems:
+            if not problem.get('sources'):
+                if source_tokens is None:
+                    source_tokens = [
+                        (item['url'], frozenset(_WORD_RE.findall(item.get('content', '').lower())))
+                        for item in source_list[:10]
+                    ]
+                    fallback_sources = [item['url'] for item in source_list[:2] if item.get('url')]
+                
+                # Try to find matching source URLs from scraped content
+                words = frozenset(_WORD_RE.findall(problem.get('problem', '').lower())[:3])
+                matching_sources = [url for url, tokens in source_tokens if not words.isdisjoint(tokens)]
+                problem['sources'] = matching_sources[:2] if matching_sources else list(fallback_sources)
+        
+        return problems
+    
+    def _fallback_problem(self, source_list: List[Dict]) -> Dict:
+        """Generic city-fixable problem used when the model output cannot be parsed"""
+        return {
+            "problem": "Homeless encampments blocking storefronts",
+            "severity": "high",
+            "description": "Restaurants are closing due to homeless encampments blocking storefronts, affecting customer access.",
+            "sources": [item.get('url', '') for item in source_list[:2] if item.get('url')],
+            "city_fixable": True,
+            "city_department": "SF 311 / Department of Public Works",
+            "city_code": ""
+        }
+    
+    def _parse_json_array(self, response: str) -> List[Dict]:
+        """
+        Extract a JSON array from a model response using progressively looser strategies
         
+        Raises:
+            json.JSONDecodeError: If no JSON could be extracted
+        """
         # Strategy 1: Try parsing directly
         try:
-            problems = json.loads(response)
-            if isinstance(problems, list) and len(problems) > 0:
-                json_text = response
-        except:
+            parsed = _json_loads(response)
+            if isinstance(parsed, list) and len(parsed) > 0:
+                return parsed
+        except json.JSONDecodeError:
             pass
         
+        # Cheap sniff before any regex scan: no bracket means no array at all,
+        # and the outermost brackets usually hold the whole array
+        start = response.find('[')
+        if start == -1:
+            raise json.JSONDecodeError("No JSON array found in response", response, 0)
+        end = response.rfind(']')
+        if end > start:
+            try:
+                parsed = _json_loads(response[start:end + 1])
+                if isinstance(parsed, list):
+                    return parsed
+            except json.JSONDecodeError:
+                pass
+        
+        json_text = None
+        
         # Strategy 2: Extract from markdown code blocks
-        if not json_text:
-            json_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', response, re.DOTALL)
-            if json_match:
-                json_text = json_match.group(1)
+        json_match = _JSON_FENCE_RE.search(response)
+        if json_match:
+            json_text = json_match.group(1)
         
         # Strategy 3: Find JSON array in the response (look for [ followed by {)
         if not json_text:
-            json_match = re.search(r'(\[\s*\{.*?\}\s*\])', response, re.DOTALL)
+            json_match = _JSON_OBJECT_ARRAY_RE.search(response)
             if json_match:
                 json_text = json_match.group(1)
         
         # Strategy 4: Find any array-like structure
         if not json_text:
-            json_match = re.search(r'(\[.*?\])', response, re.DOTALL)
+            json_match = _JSON_ARRAY_RE.search(response)
             if json_match:
                 json_text = json_match.group(1)
         
-        # Strategy 5: If still no JSON, create a fallback problem from the content
         if not json_text:
-            logger.warning(f"Could not extract JSON from response: {response[:300]}")
-            # Create a fallback problem from the mock content
-            source_list = original_scraped_content if original_scraped_content else scraped_content
-            if source_list:
-                # Extract a simple problem from the content
-                fallback_problem = {
-                    "problem": "Homeless encampments blocking storefronts",
-                    "severity": "high",
-                    "description": "Restaurants are closing due to homeless encampments blocking storefronts, affecting customer access.",
-                    "sources": [item.get('url', '') for item in source_list[:2] if item.get('url')],
-                    "city_fixable": True,
-                    "city_department": "SF 311 / Department of Public Works",
-                    "city_code": ""
-                }
-                return [fallback_problem]
-            return []
+            raise json.JSONDecodeError("No JSON array found in response", response, 0)
         
-        # Parse the extracted JSON
-        try:
-            problems = json.loads(json_text)
-            if not isinstance(problems, list):
-                problems = [problems]
-            
-            # Ensure sources are included - add from scraped_content if missing
-            source_list = original_scraped_content if original_scraped_content else scraped_content
-            for problem in problems:
-                if not problem.get('sources') or len(problem.get('sources', [])) == 0:
-                    # Try to find matching source URLs from scraped content
-                    problem_text = problem.get('problem', '').lower()
-                    matching_sources = [
-                        item['url'] for item in source_list[:10]
-                        if any(word in item.get('content', '').lower() for word in problem_text.split()[:3])
-                    ]
-                    if matching_sources:
-                        problem['sources'] = matching_sources[:2]
-                    else:
-                        problem['sources'] = [item['url'] for item in source_list[:2] if item.get('url')]
+        parsed = _json_loads(json_text)
+        if not isinstance(parsed, list):
+            parsed = [parsed]
+        return parsed
+    
+    def _rank_sources(self, scraped_content: List[Dict]) -> List[Dict]:
+        """Drop duplicate and near-duplicate sources and order them by SOURCE_PRIORITIES"""
+        seen_urls = set()
+        seen_shingles = []
+        unique_sources = []
+        for item in scraped_content:
+            url = _canonical_url(item.get('url') or '')
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
             
-            return problems
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON parsing failed even after extraction: {e}")
-            logger.warning(f"Extracted text: {json_text[:500] if json_text else 'None'}")
-            # Return fallback problem
-            source_list = original_scraped_content if original_scraped_content else scraped_content
-            if source_list:
-                fallback_problem = {
-                    "problem": "Homeless encampments blocking storefronts",
-                    "severity": "high",
-                    "description": "Restaurants are closing due to homeless encampments blocking storefronts.",
-                    "sources": [item.get('url', '') for item in source_list[:2] if item.get('url')],
-                    "city_fixable": True,
-                    "city_department": "SF 311 / Department of Public Works",
-                    "city_code": ""
-                }
-                return [fallback_problem]
-            return []
+            # The same story syndicated by another outlet only spends prompt budget;
+            # keep the first copy (Jaccard similarity over word 3-grams)
+            shingles = _shingles(item.get('content') or '')
+            if shingles and any(
+                len(shingles & seen) >= _DEDUP_SIMILARITY * len(shingles | seen) for seen in seen_shingles
+            ):
+                continue
+            seen_shingles.append(shingles)
+            unique_sources.append(item)
+        
+        # Stable sort keeps the original order within each source type
+        return sorted(unique_sources, key=lambda item: self._SOURCE_RANK.get(item.get('source_type'), len(self._SOURCE_RANK)))
     
     def _generate_solutions(self, problems: List[Dict], risk_input: Dict) -> List[Dict]:
-        """Generate actionable solutions for each problem using Nemotron"""
+        """Generate actionable solutions for all city-fixable problems, a few problems per Nemotron call"""
         
-        solutions = []
+        fixable = [problem for problem in problems if problem.get("city_fixable", False)]
+        if not fixable:
+            return []
         
-        for problem in problems:
-            if not problem.get("city_fixable", False):
-                continue
-            
-            sources_list = problem.get('sources', [])
-            sources_text = ", ".join(sources_list[:3]) if sources_list else "No sources available"
-            
-            prompt = f"""Generate SHORT, actionable solutions for this SF business problem:
-
-Problem: {problem.get('problem', '')}
-Department: {problem.get('city_department', '')}
-Sources: {sources_text}
-
-Keep solutions BRIEF:
-- Action: One sentence
-- Steps: 3-4 bullet points max (short)
-- Contact: Phone/website only
-- Timeline: Brief estimate
-- MUST cite sources in the action or steps
-
-JSON:
-{{
-  "problem": "{problem.get('problem', '')}",
-  "severity": "{problem.get('severity', 'high')}",
-  "description": "{problem.get('description', '')[:100]}",
-  "sources": {sources_list},
-  "city_fixable": true,
-  "city_department": "{problem.get('city_department', '')}",
-  "city_code": "{problem.get('city_code', 'N/A')}",
-  "solutions": [
-    {{
-      "action": "One sentence action (cite source if relevant)",
-      "steps": ["Brief step 1 (cite source)", "Brief step 2", "Brief step 3"],
-      "contact": "Phone or website",
-      "expected_timeline": "Brief timeline",
-      "city_resource": "Resource name",
-      "source_citation": "Primary source URL or reference"
-    }}
-  ]
-}}"""
-
-            system_prompt = """Generate brief, actionable solutions with contact info. Keep steps short (3-4 bullets max). Always cite sources when referencing information."""
-
-            response = self.client.generate_structured(
-                prompt,
-                system_prompt=system_prompt,
-                format_instructions="JSON object with solutions array"
+        profile = risk_input.get("profile") or {}
+        industry = profile.get('industry', 'unknown')
+        location = profile.get('location', 'SF')
+        
+        # Each batch shares one prompt's overhead, and batches stay small enough
+        # that a long response is not truncated. Batches run concurrently, and
+        # their local indices are shifted back to positions in fixable.
+        batch_size = Config.AGENT_SOLUTIONS_BATCH_SIZE
+        starts = range(0, len(fixable), batch_size)
+        solutions_by_index = {}
+        with ThreadPoolExecutor(max_workers=min(8, len(starts))) as executor:
+            batches = executor.map(
+                lambda start: self._request_solutions(fixable[start:start + batch_size], industry, location),
+                starts
             )
-            
-            try:
-                solution_data = json.loads(response)
-                # Merge with original problem data
-                problem.update(solution_data)
-                solutions.append(problem)
-            except json.JSONDecodeError:
+            for start, batch_solutions in zip(starts, batches):
+                for index, problem_solutions in batch_solutions.items():
+                    solutions_by_index[start + index] = problem_solutions
+        
+        # Retry problems the batched response skipped one at a time. The calls
+        # are independent network round trips, so run them concurrently.
+        missing = [index for index in range(len(fixable)) if index not in solutions_by_index]
+        if missing and len(fixable) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, len(missing))) as executor:
+                retried = executor.map(lambda index: self._solve_one(fixable[index], industry, location), missing)
+                for index, problem_solutions in zip(missing, retried):
+                    if problem_solutions:
+                        solutions_by_index[index] = problem_solutions
+        
+        solutions = []
+        for index, problem in enumerate(fixable):
+            if index in solutions_by_index:
+                problem["solutions"] = solutions_by_index[index]
+            else:
                 # Fallback: add basic solution structure with source citation
-                sources_list = problem.get('sources', [])
-                source_citation = sources_list[0] if sources_list else "General SF city resources"
-                problem["solutions"] = [{
-                    "action": f"Contact SF 311 for assistance (Source: {source_citation})",
-                    "steps": [
-                        f"Call 311 or visit sf311.org (based on: {source_citation})",
-                        "Describe the problem",
-                        "Follow up if needed"
-                    ],
-                    "contact": "311 or sf311.org",
-                    "expected_timeline": "48-72 hours",
-                    "city_resource": "SF 311",
-                    "source_citation": source_citation
-                }]
-                solutions.append(problem)
+                problem["solutions"] = self._fallback_solutions(problem)
+            solutions.append(problem)
         
         return solutions
     
+    def _solve_one(self, problem: Dict, industry: str, location: str) -> Optional[List[Dict]]:
+        """Generate solutions for a single problem, or None if the model gave none"""
+        return self._request_solutions([problem], industry, location).get(0)
+    
+    def _request_solutions(self, problems: List[Dict], industry: str, location: str) -> Dict[int, List[Dict]]:
+        """Ask Nemotron for solutions to each problem, keyed by position in problems"""
+        
+        # Send the problems as an indexed JSON array, so one response covers all
+        # of them and each answer maps back to its problem by index
+        problems_json = json.dumps([
+            {
+                "index": index,
+                "problem": problem.get('problem', ''),
+                "department": problem.get('city_department', ''),
+                "sources": problem.get('sources', [])[:3],
+            }
+            for index, problem in enumerate(problems)
+        ], indent=2)
+        
+        prompt = _SOLUTIONS_PROMPT_TEMPLATE.format(industry=industry, location=location, problems_json=problems_json)
+
+        entries = self._generate_json(
+            prompt,
+            system_prompt=_SOLUTIONS_SYSTEM_PROMPT,
+            structured=True,
+            format_instructions="JSON array with one solutions entry per problem index",
+            max_tokens=800 * len(problems),  # ~800 tokens covers one problem's solution JSON
+            temperature=0.0
+        ) or []
+        
+        # Malformed entries count as missing, so the caller retries or falls back
+        solutions_by_index = {}
+        for entry in entries:
+            if isinstance(entry, dict) and entry.get("index") in range(len(problems)):
+                solutions = _valid_solutions(entry.get("solutions"))
+                if solutions:
+                    solutions_by_index[entry["index"]] = solutions
+        
+        return solutions_by_index
+    
+    def _fallback_solutions(self, problem: Dict) -> List[Dict]:
+        """Basic SF 311 solution used when the model output cannot be parsed"""
+        sources_list = problem.get('sources', [])
+        source_citation = sources_list[0] if sources_list else "General SF city resources"
+        solution = _FALLBACK_SOLUTION.copy()
+        solution["action"] = f"Contact SF 311 for assistance (Source: {source_citation})"
+        solution["steps"] = [
+            f"Call 311 or visit sf311.org (based on: {source_citation})",
+            "Describe the problem",
+            "Follow up if needed"
+        ]
+        solution["source_citation"] = source_citation
+        return [solution]
+    
     def _generate_summary(self, solutions: List[Dict], risk_input: Dict) -> str:
         """Generate executive summary using Nemotron"""
         
         if not solutions:
             return "No city-fixable problems identified from external sources. Consider general business best practices and compliance."
         
-        problems_summary = "\n".join([
+        risk_message = (risk_input.get('risk_message') or '')[:100]
+        problems_summary = "\n".join(
             f"- {p.get('problem', 'Unknown')} ({p.get('severity', 'unknown')} severity)"
             for p in solutions
-        ])
+        )
         
-        prompt = f"""Generate a SHORT summary (3-4 bullets max) for a business owner:
-
-Risk: {risk_input.get('risk_message', '')[:100]}
-
-Problems found:
-{problems_summary}
-
-Format as bullet points:
-• Brief risk acknowledgment
-• Top 2-3 critical problems (one line each)
-• Key action to take"""
-
-        system_prompt = """Generate a brief bullet-point summary (3-4 bullets max)."""
+        prompt = _SUMMARY_PROMPT_TEMPLATE.format(risk_message=risk_message, problems_summary=problems_summary)
 
-        summary = self.client.generate(prompt, system_prompt=system_prompt, temperature=0.7, max_tokens=500)
+        summary = self._stream_summary(prompt, system_prompt=_SUMMARY_SYSTEM_PROMPT, temperature=0.7, max_tokens=300)
+        
+        # Cheapest rejection first: errors and empty output skip all parsing
+        if not summary or len(summary) < 20 or summary.startswith("Error:"):
+            return self._fallback_summary(solutions)
         
         # Check if summary contains thinking/reasoning text (indicates model didn't follow instructions)
-        thinking_indicators = ["we need to", "let me", "i should", "thinking", "reasoning", "format", "bullet", "let's", "craft", "should include"]
-        has_thinking = any(indicator in summary.lower()[:300] for indicator in thinking_indicators)
+        has_thinking = bool(_THINKING_RE.search(summary, 0, 300))
+        
+        # Fast path: no reasoning, and the model followed the format exactly,
+        # 2-4 lines that are all clean "• " bullets, so there is nothing to
+        # extract or filter
+        if not has_thinking and summary.startswith('• '):
+            lines = summary.split('\n')
+            if 2 <= len(lines) <= 4 and all(line.startswith('• ') and _is_clean_bullet(line[2:]) for line in lines):
+                return summary
         
         # Extract bullet points from summary (remove thinking/reasoning text)
-        import re
-        # Find bullet points (•, -, *)
-        bullets = re.findall(r'[•\-\*]\s*(.+?)(?=\n|$)', summary)
+        bullets = [text for text in map(_bullet_text, summary.splitlines()) if text is not None]
         
         # Clean bullets - remove ones that are just instructions/thinking
         if bullets:
             clean_bullets = []
             for b in bullets:
-                b_clean = b.strip()
-                # Skip bullets that are just instructions or thinking
-                if (len(b_clean) > 15 and 
-                    not any(ind in b_clean.lower() for ind in ["format", "should", "let's", "craft", "provide", "use concise"]) and
-                    not b_clean.lower().startswith(("bullet", "for ", "include"))):
-                    clean_bullets.append(b_clean)
+                if _is_clean_bullet(b):
+                    clean_bullets.append(b)
+                    if len(clean_bullets) == 4:  # Only four are ever shown
+                        break
             
             if clean_bullets and len(clean_bullets) >= 2:
-                summary = '\n'.join([f"• {b}" for b in clean_bullets[:4]])  # Limit to 4 bullets
+                summary = '\n'.join(f"• {b}" for b in clean_bullets[:4])  # Limit to 4 bullets
             else:
                 has_thinking = True  # Force fallback if we couldn't extract good bullets
         
-        # Fallback if summary contains thinking or is invalid
-        if has_thinking or not summary or summary.startswith("Error:") or len(summary) < 20:
-            problems_list = "\n".join([
-                f"• {p.get('problem', 'Unknown')} ({p.get('severity', 'unknown')} severity)"
-                for p in solutions[:3]
-            ])
-            return f"""Your business faces {len(solutions)} city-fixable problems:\n{problems_list}\n\nTake action now to address these issues before it's too late."""
+        # Fallback if summary contains thinking
+        if has_thinking:
+            return self._fallback_summary(solutions)
         
         return summary
-
+    
+    def _fallback_summary(self, solutions: List[Dict]) -> str:
+        """Plain summary listing the top problems, used when the model output is unusable"""
+        problems_list = "\n".join(map(_fallback_line, solutions[:3]))
+        return f"""Your business faces {len(solutions)} city-fixable problems:\n{problems_list}\n\nTake action now to address these issues before it's too late."""
+    
+    def _stream_summary(self, prompt: str, system_prompt: Optional[str] = None, max_bullets: int = 4, **kwargs) -> str:
+        """
+        Stream the summary and stop once max_bullets usable bullets have arrived
+        
+        Only the first max_bullets clean bullets are ever shown, so the rest of
+        the generation is wasted latency. Shares cache entries with
+        _cached_generate: a cut-off response parses to the same summary.
+        """
+        cache_key = self._get_cache_key("generate", prompt, system_prompt, kwargs)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        parts = []
+        pending = ""
+        clean_count = 0
+        chunks = self.client.stream(prompt, system_prompt=system_prompt, **kwargs)
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                # Only judge complete lines; keep the trailing partial line
+                *lines, pending = (pending + chunk).split('\n')
+                for line in lines:
+                    text = _bullet_text(line)
+                    if text is not None and _is_clean_bullet(text):
+                        clean_count += 1
+                if clean_count >= max_bullets:
+                    break
+        except Exception as e:
+            # The stream broke mid-response: use what arrived, but never cache
+            # it, or every later run would get the truncated summary
+            logger.warning(f"Summary stream failed after partial output: {e}")
+            return "".join(parts).strip()
+        finally:
+            chunks.close()
+        response = "".join(parts).strip()
+        
+        # Never cache client-side errors, so the next run retries the call
+        if not response.startswith("Error:"):
+            self._set_cached(cache_key, response)
+        return response
+    
+    def _generate_json(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        structured: bool = False,
+        attempts: int = 3,
+        **kwargs
+    ) -> Optional[List[Dict]]:
+        """
+        Generate a JSON array with Nemotron, retrying transient failures
+        
+        Client errors are retried with exponential backoff and jitter. A
+        response with no parseable JSON is retried once, immediately, with a
+        stricter JSON-only reminder and a non-zero temperature: the JSON stages
+        run at temperature 0, so resending the same request would usually return
+        the same text. Only responses that parse are cached.
+        
+        Returns:
+            Parsed JSON array, or None if every attempt failed
+        """
+        kind = "generate_structured" if structured else "generate"
+        generate = self.client.generate_structured if structured else self.client.generate
+        
+        cache_key = self._get_cache_key(kind, prompt, system_prompt, kwargs)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            try:
+                return self._parse_json_array(cached)
+            except json.JSONDecodeError:
+                pass
+        
+        response = ""
+        call_system_prompt, call_kwargs = system_prompt, kwargs
+        repair_tried = False
+        for attempt in range(attempts):
+            response = generate(prompt, system_prompt=call_system_prompt, **call_kwargs)
+            logger.debug(f"Nemotron JSON response: {response[:500]}")
+            if response.startswith("Error:"):
+                # Transport failure: back off, then send the same request again
+                if attempt + 1 < attempts:
+                    delay = min(10, 2 ** attempt) + random.uniform(0, 1)
+                    logger.info(f"Retrying Nemotron JSON call in {delay:.1f}s (attempt {attempt + 2}/{attempts})")
+                    time.sleep(delay)
+                continue
+            
+            try:
+                parsed = self._parse_json_array(response)
+            except json.JSONDecodeError as e:
+                logger.warning(f"JSON parsing failed: {e}")
+                if repair_tried:
+                    break
+                repair_tried = True
+                call_system_prompt = f"{system_prompt or ''}\n\n{_JSON_ONLY_REMINDER}".strip()
+                call_kwargs = {**kwargs, "temperature": max(kwargs.get("temperature", 0.7), 0.3)}
+                continue
+            
+            self._set_cached(cache_key, response)
+            return parsed
+        
+        logger.warning(f"Could not extract JSON from Nemotron: {response[:300]}")
+        return None
+    
+    def _cached_generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+        """Call NemotronClient.generate, reusing a cached raw response when available"""
+        cache_key = self._get_cache_key("generate", prompt, system_prompt, kwargs)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        response = self.client.generate(prompt, system_prompt=system_prompt, **kwargs)
+        
+        # Never cache client-side errors, so the next run retries the call
+        if not response.startswith("Error:"):
+            self._set_cached(cache_key, response)
+        return response
+    
+    def _get_cache_key(self, *parts: Any) -> str:
+        """Generate cache key from the model and call arguments"""
+        payload = json.dumps([getattr(self.client, "model", None), *parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _get_cached(self, cache_key: str) -> Optional[Any]:
+        """Retrieve a cached value if present"""
+        if not self.use_cache:
+            return None
+        
+        with self._memory_cache_lock:
+            if cache_key in self._memory_cache:
+                self._memory_cache.move_to_end(cache_key)
+                return self._memory_cache[cache_key]
+        
+        cache_file = self.cache_dir / f"{cache_key}.json"
+        if not cache_file.exists():
+            return None
+        
+        try:
+            with open(cache_file, "r") as f:
+                value = json.load(f)["value"]
+            cache_file.touch()  # Mark as recently used, so pruning keeps it
+            logger.debug(f"LLM cache hit: {cache_key[:12]}")
+            self._remember(cache_key, value)
+            return value
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            logger.warning(f"Invalid cache file {cache_key}: {e}")
+            return None
+    
+    def _set_cached(self, cache_key: str, value: Any) -> None:
+        """Store a value in the cache"""
+        if not self.use_cache:
+            return
+        
+        self._remember(cache_key, value)
+        cache_file = self.cache_dir / f"{cache_key}.json"
+        
+        try:
+            with open(cache_file, "w") as f:
+                json.dump({"value": value}, f)
+        except Exception as e:
+            logger.warning(f"Failed to cache LLM response: {e}")
+            return
+        
+        with self._memory_cache_lock:
+            BusinessProblemAgent._disk_writes += 1
+            prune = BusinessProblemAgent._disk_writes >= Config.AGENT_DISK_CACHE_PRUNE_EVERY
+            if prune:
+                BusinessProblemAgent._disk_writes = 0
+        if prune:
+            self._prune_disk_cache()
+    
+    def _prune_disk_cache(self) -> None:
+        """Delete the least recently used cache files beyond AGENT_DISK_CACHE_MAX_FILES"""
+        try:
+            files = [(path.stat().st_mtime, path) for path in self.cache_dir.glob("*.json")]
+        except OSError as e:
+            logger.warning(f"Failed to scan cache directory: {e}")
+            return
+        
+        excess = len(files) - Config.AGENT_DISK_CACHE_MAX_FILES
+        if excess <= 0:
+            return
+        files.sort()
+        for _, path in files[:excess]:
+            try:
+                path.unlink()
+            except OSError:
+                pass  # Already removed by a concurrent prune
+        logger.info(f"Pruned {excess} old files from the LLM cache")
+    
+    def _remember(self, cache_key: str, value: Any) -> None:
+        """Add a value to the in-process LRU, evicting the least recently used"""
+        with self._memory_cache_lock:
+            self._memory_cache[cache_key] = value
+            self._memory_cache.move_to_end(cache_key)
+            while len(self._memory_cache) > Config.AGENT_MEMORY_CACHE_SIZE:
+                self._memory_cache.popitem(last=False)
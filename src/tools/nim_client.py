@@ -11,27 +11,90 @@ Provides OpenAI-compatible interface for:
 import logging
 import json
 import re
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
-from dataclasses import dataclass
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass, replace
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
 
 try:
     from openai import OpenAI
 except ImportError:
     OpenAI = None
 
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
-from utils.config import Config
+# Relative when imported as part of the src package; agents that put src/ on
+# sys.path import this module as tools.nim_client, where only utils resolves
+try:
+    from ..utils.config import Config
+except ImportError:
+    from utils.config import Config
 
 logger = logging.getLogger(__name__)
 
+# orjson parses responses noticeably faster; its JSONDecodeError subclasses
+# json.JSONDecodeError, so callers catch either the same way. Prompt text is
+# always serialized with the stdlib json module, so prompts and the response
+# cache keys hashed from them do not depend on whether orjson is installed.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# JSON recovery patterns for NIMResponse.parse_json
+_CODEBLOCK_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)```')
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+
+# Characters a JSON document can start with; anything else cannot parse directly
+_JSON_START_CHARS = frozenset('{["-0123456789tfn')
+
+
+# Rendered schema instructions keyed by id() of the schema dict. Agents pass
+# module-level schema constants, so the same few dicts recur on every call.
+# The schema is stored with its instruction so a reused id cannot match.
+_SCHEMA_INSTRUCTIONS: Dict[int, Tuple[Dict[str, Any], str]] = {}
+_SCHEMA_INSTRUCTIONS_MAX = 32
+
+
+def _schema_instruction(schema: Dict[str, Any]) -> str:
+    """Return the system-prompt instruction for a JSON schema, rendering it once"""
+    cached = _SCHEMA_INSTRUCTIONS.get(id(schema))
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+    
+    instruction = f"""
+You must respond with valid JSON that conforms to this schema:
+```json
+{json.dumps(schema, indent=2)}
+```
+Do not include any text before or after the JSON. Only output the JSON object."""
+    
+    if len(_SCHEMA_INSTRUCTIONS) >= _SCHEMA_INSTRUCTIONS_MAX:
+        _SCHEMA_INSTRUCTIONS.clear()
+    _SCHEMA_INSTRUCTIONS[id(schema)] = (schema, instruction)
+    return instruction
+
+
+def _rejects_json_mode(error: Exception) -> bool:
+    """True if an OpenAI SDK or requests error is an HTTP 400 that names response_format"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(response, "status_code", None)
+    if status != 400:
+        return False
+    # requests errors keep the server's message in the body, not in str(error)
+    message = f"{error} {getattr(response, 'text', '')}".lower()
+    return "response_format" in message or "json_object" in message
 
-@dataclass
+
+@dataclass(slots=True)  # One per LLM call; slots keep instances small
 class NIMResponse:
     """Response from NIM chat completion"""
     content: str
@@ -46,52 +109,53 @@ class NIMResponse:
             return None
             
         content = self.content.strip()
+        if not content:
+            return None
         
-        # Strategy 1: Try direct JSON parse
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            pass
+        # Strategy 1: Try direct JSON parse, skipped when the first character
+        # rules it out (prose or a code fence)
+        if content[0] in _JSON_START_CHARS:
+            try:
+                return _json_loads(content)
+            except json.JSONDecodeError:
+                pass
         
         # Strategy 2: Extract from markdown code blocks (```json ... ``` or ``` ... ```)
-        try:
-            json_match = re.search(r'```(?:json)?\s*([\s\S]*?)```', content)
-            if json_match:
-                return json.loads(json_match.group(1).strip())
-        except json.JSONDecodeError:
-            pass
+        if '```' in content:
+            try:
+                json_match = _CODEBLOCK_RE.search(content)
+                if json_match:
+                    return _json_loads(json_match.group(1).strip())
+            except json.JSONDecodeError:
+                pass
+        
+        # Locate the outer brackets once; strategies 3-5 all slice on them
+        obj_start, obj_end = content.find('{'), content.rfind('}')
+        has_object = obj_start != -1 and obj_end > obj_start
         
         # Strategy 3: Find JSON object boundaries { ... }
-        try:
-            start = content.find('{')
-            end = content.rfind('}')
-            if start != -1 and end != -1 and end > start:
-                json_str = content[start:end + 1]
-                return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
+        if has_object:
+            try:
+                return _json_loads(content[obj_start:obj_end + 1])
+            except json.JSONDecodeError:
+                pass
         
         # Strategy 4: Find JSON array boundaries [ ... ]
-        try:
-            start = content.find('[')
-            end = content.rfind(']')
-            if start != -1 and end != -1 and end > start:
-                json_str = content[start:end + 1]
-                return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
+        arr_start, arr_end = content.find('['), content.rfind(']')
+        if arr_start != -1 and arr_end > arr_start:
+            try:
+                return _json_loads(content[arr_start:arr_end + 1])
+            except json.JSONDecodeError:
+                pass
         
         # Strategy 5: Try to fix common JSON issues
-        try:
-            # Remove trailing commas before } or ]
-            fixed = re.sub(r',\s*([}\]])', r'\1', content)
-            # Try to find JSON in the fixed content
-            start = fixed.find('{')
-            end = fixed.rfind('}')
-            if start != -1 and end != -1:
-                return json.loads(fixed[start:end + 1])
-        except json.JSONDecodeError:
-            pass
+        if has_object:
+            try:
+                # Remove trailing commas before } or ]. Only commas and whitespace
+                # are removed, so the object span found above is still the one to fix.
+                return _json_loads(_TRAILING_COMMA_RE.sub(r'\1', content[obj_start:obj_end + 1]))
+            except json.JSONDecodeError:
+                pass
         print(content)
         logger.warning(f"Failed to parse response as JSON. Content preview: {content[:200]}...")
         return None
@@ -123,6 +187,12 @@ class NIMClient:
             )
     """
     
+    # Responses to deterministic requests keyed by a hash of the full request.
+    # Shared across instances so agents that rebuild the same prompt for the
+    # same case skip the round trip to NIM.
+    _response_cache: "OrderedDict[str, NIMResponse]" = OrderedDict()
+    _response_cache_lock = threading.Lock()
+    
     def __init__(
         self,
         base_url: str = None,
@@ -139,6 +209,23 @@ class NIMClient:
         self.default_max_tokens = default_max_tokens
         self.timeout = timeout  # Store timeout
         
+        # Pooled keep-alive connections for health checks, model discovery and
+        # the raw-requests fallback, so repeat calls skip the TCP/TLS handshake
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # Cleared the first time the endpoint rejects response_format, after
+        # which structured calls rely on the schema prompt alone
+        self._json_mode_supported = True
+        
+        # Last successful health probe per check type, as monotonic timestamps
+        self._health_checked_at: Dict[str, float] = {}
+        
         # Initialize OpenAI client if available
         self.openai_client = None
         if OpenAI:
@@ -160,19 +247,29 @@ class NIMClient:
         """
         Perform NIM health check.
         
+        A successful probe is trusted for NIM_HEALTH_CACHE_SECONDS, so bursts of
+        readiness checks cost one request. Failures are never cached.
+        
         Args:
             check_type: 'ready' or 'live'
         
         Returns:
             True if healthy
         """
+        checked_at = self._health_checked_at.get(check_type)
+        if checked_at is not None and time.monotonic() - checked_at < Config.NIM_HEALTH_CACHE_SECONDS:
+            return True
+        
         base = Config.get_nim_base_url()
         endpoint = Config.NIM_HEALTH_READY if check_type == "ready" else Config.NIM_HEALTH_LIVE
         url = f"{base}{endpoint}"
         
         try:
-            response = requests.get(url, timeout=10)
-            return response.status_code == 200
+            response = self.session.get(url, timeout=10)
+            healthy = response.status_code == 200
+            if healthy:
+                self._health_checked_at[check_type] = time.monotonic()
+            return healthy
         except RequestException as e:
             logger.warning(f"NIM health check failed: {e}")
             return False
@@ -183,7 +280,7 @@ class NIMClient:
         url = f"{base}{Config.NIM_MODELS_ENDPOINT}"
         
         try:
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
             return [m.get("id", m.get("name")) for m in data.get("data", [])]
@@ -234,7 +331,9 @@ class NIMClient:
         """
         Generate structured JSON output.
         
-        Uses schema-guided prompting to ensure valid JSON output.
+        Uses schema-guided prompting to ensure valid JSON output. Object schemas
+        also request the server's JSON mode, so the reply is a bare JSON object
+        that parse_json decodes on its first attempt.
         
         Args:
             prompt: User message
@@ -247,18 +346,14 @@ class NIMClient:
         Returns:
             NIMResponse (use .parse_json() to get dict)
         """
+        # Nothing structured to add, so this is a plain chat call
+        if not output_schema and not examples:
+            return self.chat(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
+        
         max_tokens = max_tokens or self.default_max_tokens
         
         # Build system prompt with schema instructions
-        schema_instruction = ""
-        if output_schema:
-            schema_str = json.dumps(output_schema, indent=2)
-            schema_instruction = f"""
-You must respond with valid JSON that conforms to this schema:
-```json
-{schema_str}
-```
-Do not include any text before or after the JSON. Only output the JSON object."""
+        schema_instruction = _schema_instruction(output_schema) if output_schema else ""
         
         full_system = system_prompt or ""
         if schema_instruction:
@@ -276,7 +371,11 @@ Do not include any text before or after the JSON. Only output the JSON object.""
         
         messages.append({"role": "user", "content": prompt})
         
-        return self._call_completions(messages, temperature, max_tokens)
+        response_format = None
+        if output_schema and output_schema.get("type") == "object" and self._json_mode_supported:
+            response_format = {"type": "json_object"}
+        
+        return self._call_completions(messages, temperature, max_tokens, response_format=response_format)
     
     def chat_with_evidence(
         self,
@@ -330,9 +429,64 @@ CRITICAL: Do not make claims that are not supported by the evidence above.
         temperature: float,
         max_tokens: int,
         stop: List[str] = None,
+        response_format: Dict[str, Any] = None,
+    ) -> NIMResponse:
+        """Internal method to call chat completions API, serving repeats of low-temperature requests from cache"""
+        if temperature > Config.NIM_CACHE_MAX_TEMPERATURE:
+            return self._request_completions(messages, temperature, max_tokens, stop, response_format)
+        
+        cache_key = self._get_cache_key(messages, temperature, max_tokens, stop, response_format)
+        with self._response_cache_lock:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                self._response_cache.move_to_end(cache_key)
+        if cached is not None:
+            logger.debug(f"NIM response cache hit: {cache_key[:12]}")
+            return replace(cached, usage=dict(cached.usage or {}), latency_ms=0.0)
+        
+        response = self._request_completions(messages, temperature, max_tokens, stop, response_format)
+        if response.finish_reason != "error":
+            # Cache a copy, so a caller mutating its response never changes the entry
+            with self._response_cache_lock:
+                self._response_cache[cache_key] = replace(response, usage=dict(response.usage or {}))
+                self._response_cache.move_to_end(cache_key)
+                while len(self._response_cache) > Config.NIM_RESPONSE_CACHE_SIZE:
+                    self._response_cache.popitem(last=False)
+        return response
+    
+    def _get_cache_key(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        stop: List[str] = None,
+        response_format: Dict[str, Any] = None,
+    ) -> str:
+        """Hash everything that affects the completion into a cache key"""
+        payload = json.dumps(
+            {
+                "base_url": self.base_url,  # The cache is shared, so keep endpoints apart
+                "model": self.model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "stop": stop,
+                "response_format": response_format,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _request_completions(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        stop: List[str] = None,
+        response_format: Dict[str, Any] = None,
     ) -> NIMResponse:
-        """Internal method to call chat completions API"""
-        start_time = datetime.utcnow()
+        """Send a chat completions request to NIM"""
+        start_ns = time.perf_counter_ns()  # Monotonic, unaffected by clock steps mid-generation
         
         try:
             if self.openai_client:
@@ -345,10 +499,12 @@ CRITICAL: Do not make claims that are not supported by the evidence above.
                 }
                 if stop:
                     kwargs["stop"] = stop
+                if response_format:
+                    kwargs["response_format"] = response_format
                 
                 response = self.openai_client.chat.completions.create(**kwargs)
                 
-                latency_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
+                latency_ms = (time.perf_counter_ns() - start_ns) / 1e6
                 
                 return NIMResponse(
                     content=response.choices[0].message.content.strip(),
@@ -372,13 +528,15 @@ CRITICAL: Do not make claims that are not supported by the evidence above.
                 }
                 if stop:
                     payload["stop"] = stop
+                if response_format:
+                    payload["response_format"] = response_format
                 
                 headers = {"Authorization": f"Bearer {self.api_key}"}
-                response = requests.post(url, json=payload, headers=headers, timeout=120)
+                response = self.session.post(url, json=payload, headers=headers, timeout=120)
                 response.raise_for_status()
                 
                 data = response.json()
-                latency_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
+                latency_ms = (time.perf_counter_ns() - start_ns) / 1e6
                 
                 return NIMResponse(
                     content=data["choices"][0]["message"]["content"].strip(),
@@ -389,7 +547,16 @@ CRITICAL: Do not make claims that are not supported by the evidence above.
                 )
                 
         except Exception as e:
-            latency_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
+            if response_format and _rejects_json_mode(e):
+                # Retry with the schema prompt alone, and only turn JSON mode off
+                # for this client once that retry shows it was the problem
+                retried = self._request_completions(messages, temperature, max_tokens, stop)
+                if retried.finish_reason != "error":
+                    logger.info(f"NIM endpoint rejected response_format, disabling JSON mode: {e}")
+                    self._json_mode_supported = False
+                return retried
+            
+            latency_ms = (time.perf_counter_ns() - start_ns) / 1e6
             logger.error(f"NIM chat completion failed: {e}")
             
             return NIMResponse(
@@ -234,13 +234,18 @@ class RetrieverClient:
         if not result or len(result.embeddings) < 2:
             return []
         
-        query_emb = np.array(result.embeddings[0])
-        doc_embs = np.array(result.embeddings[1:])
+        # float32 halves the bytes moved; normalize rows in place so the
+        # cosine similarity below is a single matrix-vector product
+        doc_matrix = np.asarray(result.embeddings[1:], dtype=np.float32)
+        norms = np.linalg.norm(doc_matrix, axis=1)
+        norms[norms == 0] = 1.0
+        doc_matrix /= norms[:, None]
         
-        # Compute cosine similarities
-        query_norm = query_emb / np.linalg.norm(query_emb)
-        doc_norms = doc_embs / np.linalg.norm(doc_embs, axis=1, keepdims=True)
-        similarities = np.dot(doc_norms, query_norm)
+        query_vec = np.asarray(result.embeddings[0], dtype=np.float32)
+        query_norm = np.linalg.norm(query_vec)
+        if query_norm:
+            query_vec /= query_norm
+        similarities = doc_matrix @ query_vec
         
         # Get top-k
         top_indices = np.argsort(similarities)[::-1][:top_k]
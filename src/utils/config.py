@@ -47,6 +47,11 @@ class Config:
     NIM_HEALTH_READY = "/health"  # vLLM uses /health, NIM uses /v1/health/ready
     NIM_HEALTH_LIVE = "/health"
     NIM_MODELS_ENDPOINT = "/v1/models"
+    NIM_HEALTH_CACHE_SECONDS = 5.0  # Trust a successful health probe this long
+    
+    # NIMClient response cache (only deterministic, low-temperature calls are cached)
+    NIM_RESPONSE_CACHE_SIZE = 256
+    NIM_CACHE_MAX_TEMPERATURE = 0.2
     
     # Optional: NeMo Retriever NIM microservices
     EMBEDDING_NIM_URL = os.getenv("EMBEDDING_NIM_URL", "http://localhost:8001/v1")
@@ -157,8 +162,19 @@ class Config:
     AGENT_SEARCH_QUERIES_COUNT = 5
     AGENT_MAX_SOURCES_PER_QUERY = 10
     AGENT_SCRAPE_DELAY_SECONDS = 2
+    AGENT_SCRAPE_CONCURRENCY = 5  # Max in-flight search requests per scrape
     AGENT_PAGE_TIMEOUT_SECONDS = 30
+    AGENT_CONNECT_TIMEOUT_SECONDS = 5  # Fail fast on unreachable hosts; read timeouts stay per-call
     AGENT_MAX_CONTENT_LENGTH = 5000
+    AGENT_MAX_PAGE_BYTES = 512 * 1024  # Stop reading fetched HTML past this size
+    AGENT_PROMPT_CONTENT_BUDGET = 8000  # Characters of scraped content per extraction prompt
+    AGENT_PROMPT_SOURCE_CHARS = 1000  # Per-source cap, so more short sources fit the budget
+    AGENT_SOLUTIONS_BATCH_SIZE = 5  # Problems per solutions request; bounds response length per call
+    AGENT_CACHE_DIR = DATA_DIR / "cache" / "problem_agent"  # Raw LLM responses keyed by prompt hash
+    AGENT_MEMORY_CACHE_SIZE = 256  # In-process LRU in front of the disk cache
+    AGENT_DISK_CACHE_MAX_FILES = 2000  # Least recently used cache files beyond this are deleted
+    AGENT_DISK_CACHE_PRUNE_EVERY = 100  # Cache writes between prunes of the cache directory
+    AGENT_SCRAPE_CACHE_TTL_SECONDS = 24 * 3600  # Reuse scraped sources for the same query set for a day
     
     # LLM Agent settings (Nemotron)
     LLM_TEMPERATURE_DETERMINISTIC = 0.1  # For reliable outputs
@@ -12,6 +12,7 @@ Available models:
 """
 
 import json
+import threading
 from openai import OpenAI
 from .config import Config
 import logging
@@ -39,6 +40,12 @@ class NemotronClient:
         response = client.generate("What is SF's zoning policy?")
     """
     
+    # OpenAI clients keyed by (base_url, api_key). Each one owns a pooled HTTP
+    # connection, so sharing them lets every NemotronClient reuse keep-alive
+    # connections instead of paying a new TLS handshake per instance.
+    _shared_clients = {}
+    _shared_clients_lock = threading.Lock()
+    
     def __init__(self, base_url=None, api_key=None, model=None):
         self.base_url = base_url or Config.NEMOTRON_BASE_URL
         self.api_key = api_key or Config.NEMOTRON_API_KEY
@@ -50,13 +57,21 @@ class NemotronClient:
                 "environment variable for NVIDIA API access, or use local NIM."
             )
         
-        self.client = OpenAI(
-            base_url=self.base_url,
-            api_key=self.api_key or "no-key"  # OpenAI client requires non-empty string
-        )
+        self.client = self._get_shared_client(self.base_url, self.api_key or "no-key")  # OpenAI client requires non-empty string
         
         logger.info(f"NemotronClient initialized: base_url={self.base_url}, model={self.model}")
     
+    @classmethod
+    def _get_shared_client(cls, base_url, api_key):
+        """Return the process-wide OpenAI client for this endpoint, creating it once"""
+        key = (base_url, api_key)
+        with cls._shared_clients_lock:
+            client = cls._shared_clients.get(key)
+            if client is None:
+                client = OpenAI(base_url=base_url, api_key=api_key)
+                cls._shared_clients[key] = client
+            return client
+    
     def is_available(self) -> bool:
         """Check if the Nemotron API is available"""
         try:
@@ -110,6 +125,62 @@ class NemotronClient:
             print(f"\033[91m[LLM] ✗ Nemotron → Error: {e}\033[0m")
             return f"Error: Unable to generate response. {str(e)}"
     
+    def stream(self, prompt, system_prompt=None, max_tokens=1024, temperature=0.7):
+        """
+        Stream generated text from Nemotron LLM as it is produced
+        
+        Closing the generator early closes the HTTP stream, which lets the
+        caller stop once it has what it needs instead of waiting for max_tokens.
+        
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature (0-1)
+        
+        Yields:
+            Text chunks; a single "Error: ..." chunk if the request fails before any output
+        
+        Raises:
+            Exception: If the stream fails after some output, so callers can
+            tell a truncated response from a complete one
+        """
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        prompt_preview = prompt[:100] + "..." if len(prompt) > 100 else prompt
+        print(f"\033[95m[LLM] 🤖 Nemotron → Streaming request (model: {self.model})\033[0m")
+        print(f"\033[95m[LLM] 📝 Prompt: {prompt_preview}\033[0m")
+        
+        emitted = False
+        response = None
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    emitted = True
+                    yield text
+        except Exception as e:
+            logger.error(f"Error streaming text with Nemotron: {e}")
+            print(f"\033[91m[LLM] ✗ Nemotron → Error: {e}\033[0m")
+            if emitted:
+                raise
+            yield f"Error: Unable to generate response. {str(e)}"
+        finally:
+            if response is not None:
+                response.close()
+    
     def generate_json(self, prompt, system_prompt=None, schema_hint=None, max_tokens=2048):
         """
         Generate structured JSON output.
@@ -151,7 +222,7 @@ class NemotronClient:
             logger.warning(f"Failed to parse JSON response: {e}")
             return {"error": "JSON parse failed", "raw_response": response[:500]}
     
-    def generate_structured(self, prompt, system_prompt=None, format_instructions=None):
+    def generate_structured(self, prompt, system_prompt=None, format_instructions=None, max_tokens=1024, temperature=0.3):
         """
         Generate structured output (e.g., JSON) with format instructions
         
@@ -159,6 +230,8 @@ class NemotronClient:
             prompt: User prompt
             system_prompt: Optional system prompt
             format_instructions: Instructions for output format
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature (0-1)
         
         Returns:
             Generated text (should be parsed as JSON if format_instructions provided)
@@ -167,4 +240,4 @@ class NemotronClient:
         if format_instructions:
             full_prompt = f"{prompt}\n\nFormat your response as: {format_instructions}"
         
-        return self.generate(full_prompt, system_prompt=system_prompt, temperature=0.3)
+        return self.generate(full_prompt, system_prompt=system_prompt, max_tokens=max_tokens, temperature=temperature)
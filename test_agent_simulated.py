@@ -68,79 +68,77 @@ def simulate_agent_run():
     
     # Mock the scraping method to return our mock data
     with patch.object(BusinessProblemAgent, '_scrape_sources', return_value=MOCK_SCRAPED_CONTENT):
-        # Also mock Playwright initialization to avoid browser launch
-        with patch('src.risk_engine.problem_agent.sync_playwright'):
-            try:
-                # Initialize agent (will use real Nemotron API)
-                agent = BusinessProblemAgent()
+        try:
+            # Initialize agent (will use real Nemotron API)
+            agent = BusinessProblemAgent()
+            
+            print("\n1️⃣ Generating search queries...")
+            queries = agent._generate_search_queries(risk_input)
+            print(f"   ✅ Generated {len(queries)} queries:")
+            for i, q in enumerate(queries, 1):
+                print(f"      {i}. {q}")
+            
+            print("\n2️⃣ Scraping sources (MOCKED)...")
+            scraped = agent._scrape_sources(queries, risk_input)
+            print(f"   ✅ Using {len(scraped)} mock sources")
+            
+            print("\n3️⃣ Extracting problems using Nemotron...")
+            problems = agent._extract_problems(scraped, risk_input)
+            print(f"   ✅ Extracted {len(problems)} problems")
+            
+            print("\n4️⃣ Generating solutions using Nemotron...")
+            solutions = agent._generate_solutions(problems, risk_input)
+            print(f"   ✅ Generated solutions for {len(solutions)} problems")
+            
+            print("\n5️⃣ Generating summary...")
+            summary = agent._generate_summary(solutions, risk_input)
+            print("   ✅ Summary generated")
+            
+            # Compile final results
+            results = {
+                "problems": solutions,
+                "summary": summary,
+                "risk_profile": risk_input.get("profile", {})
+            }
+            
+            print("\n" + "=" * 80)
+            print("📤 OUTPUT:")
+            print("=" * 80)
+            
+            print("\n📋 SUMMARY:")
+            print(results["summary"])
+            
+            print(f"\n🔍 PROBLEMS FOUND: {len(results['problems'])}")
+            for i, problem in enumerate(results["problems"], 1):
+                print(f"\n{i}. {problem.get('problem', 'Unknown')}")
+                print(f"   Severity: {problem.get('severity', 'unknown').upper()}")
+                print(f"   Department: {problem.get('city_department', 'N/A')}")
+                print(f"   City Code: {problem.get('city_code', 'N/A')}")
                 
-                print("\n1️⃣ Generating search queries...")
-                queries = agent._generate_search_queries(risk_input)
-                print(f"   ✅ Generated {len(queries)} queries:")
-                for i, q in enumerate(queries, 1):
-                    print(f"      {i}. {q}")
-                
-                print("\n2️⃣ Scraping sources (MOCKED)...")
-                scraped = agent._scrape_sources(queries, risk_input)
-                print(f"   ✅ Using {len(scraped)} mock sources")
-                
-                print("\n3️⃣ Extracting problems using Nemotron...")
-                problems = agent._extract_problems(scraped, risk_input)
-                print(f"   ✅ Extracted {len(problems)} problems")
-                
-                print("\n4️⃣ Generating solutions using Nemotron...")
-                solutions = agent._generate_solutions(problems, risk_input)
-                print(f"   ✅ Generated solutions for {len(solutions)} problems")
-                
-                print("\n5️⃣ Generating summary...")
-                summary = agent._generate_summary(solutions, risk_input)
-                print("   ✅ Summary generated")
-                
-                # Compile final results
-                results = {
-                    "problems": solutions,
-                    "summary": summary,
-                    "risk_profile": risk_input.get("profile", {})
-                }
-                
-                print("\n" + "=" * 80)
-                print("📤 OUTPUT:")
-                print("=" * 80)
-                
-                print("\n📋 SUMMARY:")
-                print(results["summary"])
-                
-                print(f"\n🔍 PROBLEMS FOUND: {len(results['problems'])}")
-                for i, problem in enumerate(results["problems"], 1):
-                    print(f"\n{i}. {problem.get('problem', 'Unknown')}")
-                    print(f"   Severity: {problem.get('severity', 'unknown').upper()}")
-                    print(f"   Department: {problem.get('city_department', 'N/A')}")
-                    print(f"   City Code: {problem.get('city_code', 'N/A')}")
-                    
-                    if problem.get('solutions'):
-                        print("   Solutions:")
-                        for j, sol in enumerate(problem['solutions'], 1):
-                            print(f"      {j}. {sol.get('action', 'N/A')}")
-                            print(f"         Contact: {sol.get('contact', 'N/A')}")
-                            print(f"         Timeline: {sol.get('expected_timeline', 'N/A')}")
-                            if sol.get('steps'):
-                                print(f"         Steps:")
-                                for step in sol['steps']:
-                                    print(f"           - {step}")
-                
-                # Save to file
-                output_file = Path("simulated_agent_output.json")
-                with open(output_file, 'w') as f:
-                    json.dump(results, f, indent=2)
-                print(f"\n💾 Full output saved to: {output_file}")
-                
-                return results
-                
-            except Exception as e:
-                print(f"\n❌ ERROR: {e}")
-                import traceback
-                traceback.print_exc()
-                return None
+                if problem.get('solutions'):
+                    print("   Solutions:")
+                    for j, sol in enumerate(problem['solutions'], 1):
+                        print(f"      {j}. {sol.get('action', 'N/A')}")
+                        print(f"         Contact: {sol.get('contact', 'N/A')}")
+                        print(f"         Timeline: {sol.get('expected_timeline', 'N/A')}")
+                        if sol.get('steps'):
+                            print(f"         Steps:")
+                            for step in sol['steps']:
+                                print(f"           - {step}")
+            
+            # Save to file
+            output_file = Path("simulated_agent_output.json")
+            with open(output_file, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"\n💾 Full output saved to: {output_file}")
+            
+            return results
+            
+        except Exception as e:
+            print(f"\n❌ ERROR: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
 
 if __name__ == "__main__":
     results = simulate_agent_run()
@@ -0,0 +1,50 @@
+"""
+Tests for BusinessProblemAgent output post-processing
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# The agent module imports the scraping stack and the risk_engine package
+# imports pandas; skip cleanly where they are not installed
+for _module in ("pandas", "requests", "bs4", "openai"):
+    pytest.importorskip(_module)
+
+from src.risk_engine.problem_agent import BusinessProblemAgent
+
+SOLUTIONS = [
+    {"problem": "Permit delays", "severity": "high"},
+    {"problem": "Noise complaints", "severity": "medium"},
+]
+RISK_INPUT = {"risk_message": "High closure risk", "profile": {"industry": "restaurant"}}
+
+
+def _summarize(summary: str) -> str:
+    agent = BusinessProblemAgent(nemotron_client=Mock(), use_cache=False)
+    agent._stream_summary = Mock(return_value=summary)
+    return agent._generate_summary(SOLUTIONS, RISK_INPUT)
+
+
+def test_well_formed_bullets_are_returned_unchanged():
+    summary = (
+        "• Your restaurant faces a high risk of closure\n"
+        "• Permit delays and noise complaints need attention\n"
+        "• Contact the Planning Department about pending permits"
+    )
+    assert _summarize(summary) == summary
+
+
+@pytest.mark.parametrize("summary", [
+    "• Let me think about this business and its risks\n• Permit delays are the most urgent issue here",
+    "• We need to summarize the problems for the owner\n• Permit delays are the most urgent issue here",
+    "• Okay, so the owner runs a restaurant in the Mission\n• Permit delays are the most urgent issue here",
+])
+def test_reasoning_bullets_fall_back(summary):
+    result = _summarize(summary)
+    assert result != summary
+    assert result.startswith("Your business faces 2 city-fixable problems")
@@ -0,0 +1,44 @@
+"""
+Tests for RetrieverClient embedding search scoring
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+np = pytest.importorskip("numpy")
+for _module in ("requests", "dotenv"):
+    pytest.importorskip(_module)
+
+from src.tools.retriever_client import EmbeddingResult, RetrieverClient
+
+
+def _float64_cosine(query_emb, doc_embs):
+    """Reference scores: the float64 cosine similarity the search used before"""
+    query_emb = np.array(query_emb)
+    doc_embs = np.array(doc_embs)
+    query_norm = query_emb / np.linalg.norm(query_emb)
+    doc_norms = doc_embs / np.linalg.norm(doc_embs, axis=1, keepdims=True)
+    return np.dot(doc_norms, query_norm)
+
+
+def test_embedding_search_matches_float64_cosine():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(41, 1024)).tolist()  # query + 40 documents
+    documents = [f"doc {i}" for i in range(40)]
+    result = EmbeddingResult(embeddings=embeddings, model="nv-embedqa-e5-v5", usage={})
+
+    client = RetrieverClient()
+    with patch.object(client, "embed_texts", return_value=result):
+        results = client._embedding_search("query", documents, top_k=40)
+
+    expected = _float64_cosine(embeddings[0], embeddings[1:])
+    scores = np.array([item["score"] for item in results])
+
+    assert [item["index"] for item in results] == list(np.argsort(expected)[::-1])
+    assert np.allclose(scores, expected[[item["index"] for item in results]], atol=1e-5)
+    assert all(item["text"] == documents[item["index"]] for item in results)